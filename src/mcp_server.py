@@ -1,19 +1,27 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
-import subprocess
-import json
+from typing import Callable, List, Dict, Optional, Tuple
+from dataclasses import dataclass, field, replace
 import aiohttp
-import os
+import asyncio
+import ijson
+import orjson
 import re
-from packaging import version
+from urllib.parse import quote
+from cachetools import LRUCache, TTLCache
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.specifiers import InvalidSpecifier, SpecifierSet
+from packaging.utils import InvalidWheelFilename, canonicalize_name, parse_wheel_filename
+from packaging.version import InvalidVersion, Version, parse as parse_version
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 class PackageQuery(BaseModel):
     package_name: str
     package_manager: str = "pip"  # pip, npm, cargo, composer, etc.
     version: Optional[str] = None
+    compact: bool = False  # return versions as a single newline-joined string
 
 class DependencyQuery(BaseModel):
     package_name: str
@@ -32,12 +40,15 @@ class PackageResult(BaseModel):
     versions: List[str]
     latest_version: str
     description: Optional[str] = None
+    compact: bool = False  # versions holds one newline-joined string
     error: Optional[str] = None
 
 class DependencyResult(BaseModel):
     package_name: str
     package_manager: str
     dependencies: Dict
+    # pip only: every requires_dist entry of the package, {name: [{"specifier", "extras", "marker"}]}
+    requirements: Optional[Dict] = None
     error: Optional[str] = None
 
 class VersionResult(BaseModel):
@@ -47,12 +58,421 @@ class VersionResult(BaseModel):
     recommended_version: Optional[str]
     error: Optional[str] = None
 
-# Registry API URLs
-PACKAGE_REGISTRIES = {
-    "pip": "https://pypi.org/pypi/{package}/json",
-    "npm": "https://registry.npmjs.org/{package}",
+# How much of a package a manifest holds; each level includes the ones below it
+MANIFEST_VERSIONS = 0  # versions only
+MANIFEST_SUMMARY = 1  # plus latest version and description
+MANIFEST_FULL = 2  # plus the raw registry document
+
+@dataclass(slots=True)
+class Manifest:
+    versions: Tuple[str, ...]
+    latest: str
+    description: Optional[str]
+    # Full registry document; None below MANIFEST_FULL
+    raw: Optional[Dict]
+    # (Version, version string) pairs, newest first
+    parsed: List[Tuple[Version, str]]
+    detail: int = MANIFEST_FULL
+    # constraint -> (compatible versions, recommended version), dropped along with the manifest
+    filter_cache: LRUCache = field(default_factory=lambda: LRUCache(maxsize=64))
+    # The final (non-pre/dev) releases from parsed, newest first
+    stable: List[Tuple[Version, str]] = field(init=False)
+    
+    def __post_init__(self):
+        self.stable = [(pv, v) for pv, v in self.parsed if not pv.is_prerelease]
+
+def _quote_name(package: str, safe: str = "") -> str:
+    """Percent-encode a package name as exactly one URL path segment."""
+    # "." and ".." survive quoting and would be resolved as relative path segments
+    if package in (".", ".."):
+        raise ValueError(f"Invalid package name: {package}")
+    return quote(package, safe=safe)
+
+# Registry API URL builders; names are percent-encoded so scoped npm packages (@scope/pkg) stay one path segment
+PACKAGE_REGISTRIES: Dict[str, Callable[[str], str]] = {
+    "pip": lambda package: f"https://pypi.org/pypi/{_quote_name(package)}/json",
+    "npm": lambda package: f"https://registry.npmjs.org/{_quote_name(package, safe='@')}",
+}
+
+# Deepest transitive walk /dependencies will do, so one request can't crawl a whole registry
+MAX_DEPENDENCY_DEPTH = 10
+
+# Most queries /batch_package_info accepts at once, so one request can't fan out unbounded
+MAX_BATCH_SIZE = 100
+
+# Quoted literals in a marker, removed so only its variable names are left to inspect
+_MARKER_LITERAL = re.compile(r"'[^']*'|\"[^\"]*\"")
+
+# Identifies this server to the registries, some of which rate-limit unknown clients
+USER_AGENT = "package-manager-mcp-server (+https://github.com/bui21x/package-manager-mcp-server)"
+
+# Lighter endpoints that only list versions
+_SIMPLE_URL: Dict[str, Callable[[str], str]] = {
+    "pip": lambda package: f"https://pypi.org/simple/{_quote_name(package)}/",
+}
+
+# Manifests built from registry documents, keyed by (package_manager, package_name)
+_REGISTRY_CACHE = TTLCache(maxsize=2048, ttl=300)
+# Last known (etag, manifest) per URL, kept past expiry so refreshes can be revalidated.
+# Manifests are stored without their raw document, so only lighter fetches revalidate.
+_REGISTRY_ETAGS = TTLCache(maxsize=2048, ttl=3600)
+# Registry fetches in progress, keyed by (package_manager, package_name, detail)
+_INFLIGHT: Dict[tuple, asyncio.Task] = {}
+# Pooled connections per registry; each package manager's URLs all live on one host
+REGISTRY_CONNECTIONS_PER_HOST = 32
+# Caps concurrent requests per registry at its share of the pool, so requests queue here
+# rather than inside the session, where waiting for a connection counts against the timeout
+_REGISTRY_SEMAPHORES = {
+    package_manager: asyncio.Semaphore(REGISTRY_CONNECTIONS_PER_HOST) for package_manager in PACKAGE_REGISTRIES
 }
 
+@app.on_event("startup")
+async def startup():
+    # Shared HTTP session so registry requests reuse pooled keep-alive connections.
+    # Sized so every registry can use its full per-host share at once.
+    app.state.http = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=REGISTRY_CONNECTIONS_PER_HOST * len(PACKAGE_REGISTRIES),
+            limit_per_host=REGISTRY_CONNECTIONS_PER_HOST,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
+            happy_eyeballs_delay=0.25
+        ),
+        timeout=aiohttp.ClientTimeout(total=15),
+        headers={"User-Agent": USER_AGENT}
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    await app.state.http.close()
+
+def _parse_npm_version(v: str) -> Tuple[Version, tuple]:
+    """Map a semver string onto a PEP 440 Version plus a key ordering its pre-release tag.
+
+    Any semver pre-release (1.0.0-next.3, 1.0.0-1) becomes a dev release of its core
+    version, so it sorts and matches specifiers below the release, and counts as a
+    pre-release. Build metadata is ignored.
+    """
+    core, _, pre = v.split("+", 1)[0].partition("-")
+    if core.count(".") != 2 or not core.replace(".", "").isdigit():
+        raise InvalidVersion(v)
+    if not pre:
+        return Version(core), ()
+    # Semver precedence: numeric identifiers sort below alphanumeric ones
+    pre_key = tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in pre.split("."))
+    return Version(f"{core}.dev0"), pre_key
+
+def _parse_versions(versions: Tuple[str, ...], package_manager: str = "pip") -> List[Tuple[Version, str]]:
+    """Return (Version, version string) pairs, newest first, skipping invalid versions."""
+    keyed = []
+    for v in versions:
+        try:
+            if package_manager == "npm":
+                parsed_version, pre_key = _parse_npm_version(v)
+            else:
+                parsed_version, pre_key = parse_version(v), ()
+        except InvalidVersion:
+            continue
+        keyed.append((parsed_version, pre_key, v))
+    keyed.sort(reverse=True)
+    return [(parsed_version, v) for parsed_version, pre_key, v in keyed]
+
+def _pip_latest(parsed: List[Tuple[Version, str]]) -> str:
+    """PyPI's notion of latest: the newest final release, else the newest release."""
+    return next((v for pv, v in parsed if not pv.is_prerelease), parsed[0][1] if parsed else "")
+
+def _build_manifest(package_manager: str, data: Dict) -> Manifest:
+    if package_manager == "pip":
+        # A release is yanked when all of its files are
+        versions = tuple(
+            v for v, files in data["releases"].items()
+            if not (files and all(f.get("yanked") for f in files))
+        )
+        parsed = _parse_versions(versions)
+        # Computed the same way at every detail level, since the simple index has no info.version
+        latest_version = _pip_latest(parsed)
+        description = data["info"]["summary"]
+    elif package_manager == "npm":
+        versions = tuple(data["versions"])
+        parsed = _parse_versions(versions, package_manager)
+        latest_version = data["dist-tags"]["latest"]
+        description = data.get("description")
+    else:
+        versions = ()
+        parsed = []
+        latest_version = ""
+        description = ""
+    return Manifest(versions, latest_version, description, data, parsed)
+
+async def _stream_manifest_pip(response: aiohttp.ClientResponse) -> Manifest:
+    """Build a summary manifest from a PyPI JSON response without materializing it."""
+    # release -> [file count, yanked file count]
+    file_counts = {}
+    description = None
+    # Per-file metadata under each release is skipped except for its yanked flag
+    async for prefix, event, value in ijson.parse_async(response.content):
+        if prefix == "releases" and event == "map_key":
+            counts = file_counts[value] = [0, 0]
+        elif prefix.startswith("releases."):
+            if event == "start_map" and prefix.endswith(".item"):
+                counts[0] += 1
+            elif event == "boolean" and value and prefix.endswith(".item.yanked"):
+                counts[1] += 1
+        elif prefix == "info.summary" and event in ("string", "null"):
+            description = value
+    
+    versions = _drop_yanked(file_counts)
+    parsed = _parse_versions(versions)
+    return Manifest(versions, _pip_latest(parsed), description, None, parsed, MANIFEST_SUMMARY)
+
+def _drop_yanked(file_counts: Dict[str, List[int]]) -> Tuple[str, ...]:
+    """Return the releases of a {release: [files, yanked files]} map whose files aren't all yanked."""
+    return tuple(v for v, (files, yanked) in file_counts.items() if not (files and files == yanked))
+
+# Distribution extensions whose filenames are "{name}-{version}{extension}"
+_SDIST_EXTENSIONS = (".tar.gz", ".tar.bz2", ".tar.xz", ".tgz", ".zip")
+
+def _simple_file_version(filename: str) -> Optional[str]:
+    """Return the version of a distribution file as written in its filename, if recognizable."""
+    if filename.endswith(".whl"):
+        try:
+            parse_wheel_filename(filename)
+        except (InvalidWheelFilename, InvalidVersion):
+            return None
+        return filename.split("-")[1]
+    if filename.endswith(".egg"):
+        # {name}-{version}[-pyX.Y[-platform]].egg, with "-" in name and version escaped to "_"
+        parts = filename[:-len(".egg")].split("-")
+        return parts[1] if len(parts) > 1 else None
+    for extension in _SDIST_EXTENSIONS:
+        if filename.endswith(extension):
+            parts = filename[:-len(extension)].rsplit("-", 1)
+            return parts[1] if len(parts) > 1 else None
+    return None
+
+def _build_simple_manifest(data: Dict) -> Manifest:
+    """Build a versions-only manifest from a PyPI Simple API (JSON) project page."""
+    # API 1.1 lists every release, including ones without files, spelled as published
+    # (as the JSON API's release keys are). Files only tell us what is yanked. On 1.0
+    # pages the releases have to be recovered from the filenames.
+    listed = "versions" in data
+    published = {}
+    file_counts = {}
+    for v in data.get("versions", ()):
+        file_counts[v] = [0, 0]
+        try:
+            published.setdefault(parse_version(v), v)
+        except InvalidVersion:
+            continue
+    
+    for f in data["files"]:
+        raw_version = _simple_file_version(f["filename"])
+        if raw_version is None:
+            continue
+        try:
+            file_version = parse_version(raw_version)
+        except InvalidVersion:
+            continue
+        v = published.get(file_version) if listed else published.setdefault(file_version, raw_version)
+        if v is None:
+            continue
+        counts = file_counts.setdefault(v, [0, 0])
+        counts[0] += 1
+        if f.get("yanked"):
+            counts[1] += 1
+    
+    versions = _drop_yanked(file_counts)
+    parsed = _parse_versions(versions)
+    return Manifest(versions, _pip_latest(parsed), None, None, parsed, MANIFEST_VERSIONS)
+
+async def _fetch_manifest(package_manager: str, package_name: str, detail: int) -> Optional[Manifest]:
+    """Fetch a package from its registry at the given detail level and cache the result."""
+    headers = {}
+    if detail == MANIFEST_VERSIONS and package_manager in _SIMPLE_URL:
+        registry_url = _SIMPLE_URL[package_manager](package_name)
+        headers["Accept"] = "application/vnd.pypi.simple.v1+json"
+    else:
+        registry_url = PACKAGE_REGISTRIES[package_manager](package_name)
+    
+    stale = _REGISTRY_ETAGS.get(registry_url)
+    if stale and stale[1].detail >= detail:
+        headers["If-None-Match"] = stale[0]
+    else:
+        stale = None
+    
+    async with _REGISTRY_SEMAPHORES[package_manager], app.state.http.get(registry_url, headers=headers) as response:
+        if response.status == 304 and stale:
+            manifest = stale[1]
+        elif response.status != 200:
+            return None
+        elif detail == MANIFEST_VERSIONS and package_manager in _SIMPLE_URL:
+            data = await response.json(loads=orjson.loads, content_type=None)
+            manifest = _build_simple_manifest(data)
+        elif detail < MANIFEST_FULL and package_manager == "pip":
+            manifest = await _stream_manifest_pip(response)
+        else:
+            # content_type=None tolerates charset variations in the registry's Content-Type
+            data = await response.json(loads=orjson.loads, content_type=None)
+            manifest = _build_manifest(package_manager, data)
+        
+        etag = response.headers.get("ETag")
+        if etag and response.status == 200:
+            _REGISTRY_ETAGS[registry_url] = (etag, replace(
+                manifest, raw=None, detail=min(manifest.detail, MANIFEST_SUMMARY),
+                filter_cache=LRUCache(maxsize=64)
+            ))
+    
+    # Never replace a richer cached manifest with a lighter one
+    key = (package_manager, package_name)
+    cached = _REGISTRY_CACHE.get(key)
+    if not cached or cached.detail <= manifest.detail:
+        _REGISTRY_CACHE[key] = manifest
+    return manifest
+
+async def _load_manifest(package_manager: str, package_name: str,
+                         detail: int = MANIFEST_FULL) -> Optional[Manifest]:
+    """Fetch and summarize a package from its registry, or None if it does not exist.
+
+    The returned manifest holds at least the requested detail level; lower levels let
+    PyPI lookups use the simple index or a streaming parse instead of the full document.
+    """
+    manifest = _REGISTRY_CACHE.get((package_manager, package_name))
+    if manifest and manifest.detail >= detail:
+        return manifest
+    
+    # Concurrent callers for the same fetch share one task. Every caller, including the
+    # one that started it, awaits it through shield(), so a cancelled caller never
+    # cancels the fetch for the others.
+    key = (package_manager, package_name, detail)
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_manifest(package_manager, package_name, detail))
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda done: _fetch_done(key, done))
+    return await asyncio.shield(task)
+
+def _fetch_done(key: tuple, task: asyncio.Task):
+    if _INFLIGHT.get(key) is task:
+        del _INFLIGHT[key]
+    # Mark the exception retrieved so a fetch every caller abandoned doesn't log a warning
+    if not task.cancelled():
+        task.exception()
+
+def _marker_variables(marker) -> set:
+    """Return the variable names (python_version, extra, ...) a marker tests."""
+    return set(re.findall(r"[a-z_]+", _MARKER_LITERAL.sub("", str(marker))))
+
+def _extract_dependencies(package_manager: str, data: Dict,
+                          version_to_check: Optional[str]) -> Tuple[Dict, set, Dict]:
+    """Return the direct {name: specifier} dependencies of a package version.
+
+    Also returns the names that only apply under an environment marker, which
+    transitive walks don't expand, and for pip every requires_dist entry in structured
+    form, including the extra-only ones left out of the dependencies.
+    """
+    dependencies = {}
+    conditional = set()
+    unconditional = set()
+    requirements = {}
+    if package_manager == "pip":
+        version_to_check = version_to_check or data["info"]["version"]
+        if version_to_check in data["releases"]:
+            # Get dependencies from requires_dist
+            requires_dist = data["info"].get("requires_dist", [])
+            if requires_dist:
+                for dep in requires_dist:
+                    try:
+                        requirement = Requirement(dep)
+                    except InvalidRequirement:
+                        continue
+                    # The same name can be listed once per marker; keep every alternative
+                    requirements.setdefault(requirement.name, []).append({
+                        "specifier": str(requirement.specifier),
+                        "extras": sorted(requirement.extras),
+                        "marker": str(requirement.marker) if requirement.marker else None
+                    })
+                    # Optional dependencies only apply when an extra is requested
+                    if requirement.marker and "extra" in _marker_variables(requirement.marker):
+                        continue
+                    (conditional if requirement.marker else unconditional).add(requirement.name)
+                    # Prefer the unconditional entry's specifier, else the first alternative's
+                    if requirement.name not in dependencies or not requirement.marker:
+                        dependencies[requirement.name] = str(requirement.specifier)
+    elif package_manager == "npm":
+        version_to_check = version_to_check or data["dist-tags"]["latest"]
+        if version_to_check in data["versions"]:
+            # Get dependencies from package.json
+            deps = data["versions"][version_to_check].get("dependencies", {})
+            dependencies = deps
+    return dependencies, conditional - unconditional, requirements
+
+async def _resolve_dependency_graph(package_manager: str, root: Manifest, root_name: str,
+                                    root_version: Optional[str], depth: int) -> Dict:
+    """Return the dependency graph below a package and its post-order install order.
+
+    Packages left unexpanded at the depth limit appear in install_order as leaves;
+    marker-gated dependencies are listed in the graph but left out of install_order.
+    """
+    # Discover level by level, so every package is expanded at the shallowest depth it
+    # appears at and each level's manifests are fetched concurrently.
+    # Children resolve to their latest release.
+    # PyPI names are compared in canonical form, so "Foo_Bar" and "foo-bar" are one node
+    key = canonicalize_name if package_manager == "pip" else str
+    graph = {}
+    # Marker-gated edges per package; they are listed but not walked
+    gated = {}
+    # Packages that could not be loaded, {name: error}; they stay in the graph with no dependencies
+    errors = {}
+
+    def add(name: str, manifest: Optional[Manifest], version: Optional[str]) -> List[str]:
+        dependencies, conditional, _ = _extract_dependencies(package_manager, manifest.raw, version) if manifest else ({}, set(), {})
+        graph[name] = {key(dep_name): specifier for dep_name, specifier in dependencies.items()}
+        gated[name] = {key(dep_name) for dep_name in conditional}
+        return [dep_name for dep_name in graph[name] if dep_name not in gated[name]]
+
+    root_name = key(root_name)
+    frontier = add(root_name, root, root_version)
+    for _ in range(depth - 1):
+        frontier = [dep_name for dep_name in dict.fromkeys(frontier) if dep_name not in graph]
+        if not frontier:
+            break
+        manifests = await asyncio.gather(
+            *[_load_manifest(package_manager, dep_name) for dep_name in frontier],
+            return_exceptions=True
+        )
+        next_frontier = []
+        for dep_name, manifest in zip(frontier, manifests):
+            if isinstance(manifest, BaseException):
+                errors[dep_name] = str(manifest) or type(manifest).__name__
+                manifest = None
+            elif manifest is None:
+                errors[dep_name] = f"Package not found: {dep_name}"
+            next_frontier.extend(add(dep_name, manifest, None))
+        frontier = next_frontier
+    
+    # Post-order over the finished graph: a package comes after everything it depends on
+    install_order = []
+    visited = set()
+    stack = [(root_name, False)]
+    while stack:
+        name, children_done = stack.pop()
+        if children_done:
+            install_order.append(name)
+            continue
+        if name in visited:
+            continue
+        visited.add(name)
+        stack.append((name, True))
+        for dep_name in reversed(list(graph.get(name, ()))):
+            if dep_name not in gated[name] and dep_name not in visited:
+                stack.append((dep_name, False))
+    
+    return {"install_order": install_order, "graph": graph, "errors": errors}
+
+def _encode_versions(versions: Tuple[str, ...], compact: bool):
+    # A single joined string is much cheaper to encode and send than thousands of JSON strings
+    return ["\n".join(versions)] if compact else versions
+
 @app.post('/package_info', response_model=PackageResult)
 async def get_package_info(query: PackageQuery):
     try:
@@ -68,41 +488,26 @@ async def get_package_info(query: PackageQuery):
             )
         
         # Fetch package information from registry
-        registry_url = PACKAGE_REGISTRIES[package_manager].format(package=query.package_name)
-        async with aiohttp.ClientSession() as session:
-            async with session.get(registry_url) as response:
-                if response.status != 200:
-                    return PackageResult(
-                        package_name=query.package_name,
-                        package_manager=package_manager,
-                        versions=[],
-                        latest_version="",
-                        error=f"Package not found: {query.package_name}"
-                    )
-                
-                data = await response.json()
-        
-        # Parse response based on package manager
-        if package_manager == "pip":
-            versions = list(data["releases"].keys())
-            latest_version = data["info"]["version"]
-            description = data["info"]["summary"]
-        elif package_manager == "npm":
-            versions = list(data["versions"].keys())
-            latest_version = data["dist-tags"]["latest"]
-            description = data["description"]
-        else:
-            versions = []
-            latest_version = ""
-            description = ""
+        manifest = await _load_manifest(package_manager, query.package_name, MANIFEST_SUMMARY)
+        if manifest is None:
+            return PackageResult(
+                package_name=query.package_name,
+                package_manager=package_manager,
+                versions=[],
+                latest_version="",
+                error=f"Package not found: {query.package_name}"
+            )
         
-        return PackageResult(
-            package_name=query.package_name,
-            package_manager=package_manager,
-            versions=versions,
-            latest_version=latest_version,
-            description=description
-        )
+        # Registry data is trusted, so skip response_model validation on the success path
+        return ORJSONResponse(content={
+            "package_name": query.package_name,
+            "package_manager": package_manager,
+            "versions": _encode_versions(manifest.versions, query.compact),
+            "latest_version": manifest.latest,
+            "description": manifest.description,
+            "compact": query.compact,
+            "error": None
+        })
     except Exception as e:
         return PackageResult(
             package_name=query.package_name,
@@ -112,6 +517,61 @@ async def get_package_info(query: PackageQuery):
             error=str(e)
         )
 
+@app.post('/batch_package_info', response_model=List[PackageResult])
+async def get_batch_package_info(queries: List[PackageQuery]):
+    if len(queries) > MAX_BATCH_SIZE:
+        # Reject the whole batch before any registry request is made
+        error = f"batch must have at most {MAX_BATCH_SIZE} queries"
+        return [
+            PackageResult(
+                package_name=query.package_name,
+                package_manager=query.package_manager.lower(),
+                versions=[],
+                latest_version="",
+                error=error
+            )
+            for query in queries
+        ]
+    
+    package_managers = [query.package_manager.lower() for query in queries]
+    supported = [i for i, package_manager in enumerate(package_managers) if package_manager in PACKAGE_REGISTRIES]
+    
+    # Load every package concurrently; the per-registry semaphores bound parallelism
+    manifests = await asyncio.gather(
+        *[_load_manifest(package_managers[i], queries[i].package_name, MANIFEST_SUMMARY) for i in supported],
+        return_exceptions=True
+    )
+    loaded = dict(zip(supported, manifests))
+    
+    results = []
+    for i, (query, package_manager) in enumerate(zip(queries, package_managers)):
+        manifest = loaded.get(i)
+        if i not in loaded:
+            error = f"Unsupported package manager: {package_manager}"
+        elif isinstance(manifest, BaseException):
+            error = str(manifest)
+        elif manifest is None:
+            error = f"Package not found: {query.package_name}"
+        else:
+            results.append(PackageResult(
+                package_name=query.package_name,
+                package_manager=package_manager,
+                versions=_encode_versions(manifest.versions, query.compact),
+                latest_version=manifest.latest,
+                description=manifest.description,
+                compact=query.compact
+            ))
+            continue
+        
+        results.append(PackageResult(
+            package_name=query.package_name,
+            package_manager=package_manager,
+            versions=[],
+            latest_version="",
+            error=error
+        ))
+    return results
+
 @app.post('/dependencies', response_model=DependencyResult)
 async def get_dependencies(query: DependencyQuery):
     try:
@@ -125,46 +585,35 @@ async def get_dependencies(query: DependencyQuery):
                 error=f"Unsupported package manager: {package_manager}"
             )
         
+        if query.depth and query.depth > MAX_DEPENDENCY_DEPTH:
+            return DependencyResult(
+                package_name=query.package_name,
+                package_manager=package_manager,
+                dependencies={},
+                error=f"depth must be at most {MAX_DEPENDENCY_DEPTH}"
+            )
+        
         # Fetch package information from registry
-        registry_url = PACKAGE_REGISTRIES[package_manager].format(package=query.package_name)
-        async with aiohttp.ClientSession() as session:
-            async with session.get(registry_url) as response:
-                if response.status != 200:
-                    return DependencyResult(
-                        package_name=query.package_name,
-                        package_manager=package_manager,
-                        dependencies={},
-                        error=f"Package not found: {query.package_name}"
-                    )
-                
-                data = await response.json()
+        manifest = await _load_manifest(package_manager, query.package_name)
+        if manifest is None:
+            return DependencyResult(
+                package_name=query.package_name,
+                package_manager=package_manager,
+                dependencies={},
+                error=f"Package not found: {query.package_name}"
+            )
         
-        # Extract dependencies based on package manager
-        dependencies = {}
-        if package_manager == "pip":
-            version_to_check = query.version or data["info"]["version"]
-            if version_to_check in data["releases"]:
-                # Get dependencies from requires_dist
-                requires_dist = data["info"].get("requires_dist", [])
-                if requires_dist:
-                    for dep in requires_dist:
-                        # Parse dependency string
-                        match = re.match(r"([^<>=~!]+)(.+)?", dep)
-                        if match:
-                            dep_name = match.group(1).strip()
-                            dep_version = match.group(2) if match.group(2) else ""
-                            dependencies[dep_name] = dep_version
-        elif package_manager == "npm":
-            version_to_check = query.version or data["dist-tags"]["latest"]
-            if version_to_check in data["versions"]:
-                # Get dependencies from package.json
-                deps = data["versions"][version_to_check].get("dependencies", {})
-                dependencies = deps
+        dependencies, _, requirements = _extract_dependencies(package_manager, manifest.raw, query.version)
+        if query.depth and query.depth > 1:
+            dependencies = await _resolve_dependency_graph(
+                package_manager, manifest, query.package_name, query.version, query.depth
+            )
         
         return DependencyResult(
             package_name=query.package_name,
             package_manager=package_manager,
-            dependencies=dependencies
+            dependencies=dependencies,
+            requirements=requirements or None
         )
     except Exception as e:
         return DependencyResult(
@@ -188,71 +637,53 @@ async def get_compatible_versions(query: VersionQuery):
             )
         
         # Fetch package information from registry
-        registry_url = PACKAGE_REGISTRIES[package_manager].format(package=query.package_name)
-        async with aiohttp.ClientSession() as session:
-            async with session.get(registry_url) as response:
-                if response.status != 200:
+        manifest = await _load_manifest(package_manager, query.package_name, MANIFEST_VERSIONS)
+        if manifest is None:
+            return VersionResult(
+                package_name=query.package_name,
+                package_manager=package_manager,
+                compatible_versions=[],
+                error=f"Package not found: {query.package_name}"
+            )
+        
+        # Filter compatible versions if version_constraint is provided
+        compatible_versions = manifest.versions
+        recommended_version = manifest.latest
+        
+        if query.version_constraint:
+            filtered = manifest.filter_cache.get(query.version_constraint)
+            if filtered is None:
+                try:
+                    spec = SpecifierSet(query.version_constraint)
+                except InvalidSpecifier:
                     return VersionResult(
                         package_name=query.package_name,
                         package_manager=package_manager,
                         compatible_versions=[],
-                        error=f"Package not found: {query.package_name}"
+                        recommended_version=None,
+                        error=f"Invalid version constraint: {query.version_constraint}"
                     )
                 
-                data = await response.json()
-        
-        # Get all versions
-        all_versions = []
-        if package_manager == "pip":
-            all_versions = list(data["releases"].keys())
-            latest_version = data["info"]["version"]
-        elif package_manager == "npm":
-            all_versions = list(data["versions"].keys())
-            latest_version = data["dist-tags"]["latest"]
-        
-        # Filter compatible versions if version_constraint is provided
-        compatible_versions = all_versions
-        recommended_version = latest_version
-        
-        if query.version_constraint:
-            constraint = query.version_constraint
+                # Already parsed and sorted newest first, so filtering keeps that order. Like pip,
+                # only consider pre-releases if the constraint names one or nothing else matches.
+                compatible = ()
+                if not spec.prereleases:
+                    compatible = tuple(v for pv, v in manifest.stable if spec.contains(pv, prereleases=True))
+                if not compatible:
+                    compatible = tuple(v for pv, v in manifest.parsed if spec.contains(pv, prereleases=True))
+                filtered = (compatible, compatible[0] if compatible else None)
+                manifest.filter_cache[query.version_constraint] = filtered
             
-            # Simple version constraint parsing
-            if constraint.startswith(">="):
-                min_version = constraint[2:].strip()
-                compatible_versions = [v for v in all_versions if version.parse(v) >= version.parse(min_version)]
-            elif constraint.startswith(">"):
-                min_version = constraint[1:].strip()
-                compatible_versions = [v for v in all_versions if version.parse(v) > version.parse(min_version)]
-            elif constraint.startswith("<="):
-                max_version = constraint[2:].strip()
-                compatible_versions = [v for v in all_versions if version.parse(v) <= version.parse(max_version)]
-            elif constraint.startswith("<"):
-                max_version = constraint[1:].strip()
-                compatible_versions = [v for v in all_versions if version.parse(v) < version.parse(max_version)]
-            elif constraint.startswith("=="):
-                exact_version = constraint[2:].strip()
-                compatible_versions = [v for v in all_versions if v == exact_version]
-            elif constraint.startswith("~="):
-                compatible_version = constraint[2:].strip()
-                # Approximate version matching
-                parts = compatible_version.split(".")
-                prefix = ".".join(parts[:-1]) + "."
-                compatible_versions = [v for v in all_versions if v.startswith(prefix)]
-            
-            # Update recommended version
-            if compatible_versions:
-                compatible_versions.sort(key=lambda v: version.parse(v), reverse=True)
-                recommended_version = compatible_versions[0]
-            else:
-                recommended_version = None
+            compatible_versions, recommended_version = filtered
         
-        return VersionResult(
-            package_name=query.package_name,
-            package_manager=package_manager,
-            compatible_versions=compatible_versions,
-            recommended_version=recommended_version
-        )
+        # Registry data is trusted, so skip response_model validation on the success path
+        return ORJSONResponse(content={
+            "package_name": query.package_name,
+            "package_manager": package_manager,
+            "compatible_versions": compatible_versions,
+            "recommended_version": recommended_version,
+            "error": None
+        })
     except Exception as e:
         return VersionResult(
             package_name=query.package_name,